@@ -13,8 +13,12 @@ Python responsibilities:
 """
 
 import os
+import re
 import sys
+import threading
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
 
 try:
     from pyswip import Prolog
@@ -64,6 +68,22 @@ def safe_input(prompt: str = "") -> str:
 # Path to the Prolog knowledge base (relative to this file's directory)
 KB_PATH = Path(__file__).resolve().parent.parent / "knowledge_base" / "expert_system.pl"
 
+# Resolved once at import so engine construction (tests build several)
+# doesn't repeat the path normalization and stat() for the default KB.
+_KB_POSIX = str(KB_PATH.resolve()).replace("\\", "/")
+_KB_EXISTS = KB_PATH.exists()
+
+# Valid Prolog atom for a symptom ID. Symptom names are interpolated into
+# query strings, so anything that doesn't match is rejected up front rather
+# than handed to the Prolog reader.
+SYMPTOM_ID_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+# Menu-input token shapes, precompiled so the interactive loop can dispatch
+# without exception-driven int() parsing. A lone number (including the
+# negative command codes) or an inclusive range like "1-5".
+_NUM_RE = re.compile(r"^-?\d+$")
+_RANGE_RE = re.compile(r"^(\d+)\s*-\s*(\d+)$")
+
 DISCLAIMER = """
 ╔══════════════════════════════════════════════════════════════════════════════╗
 ║  ⚠  DISCLAIMER                                                            ║
@@ -78,17 +98,31 @@ DISCLAIMER = """
 ╚══════════════════════════════════════════════════════════════════════════════╝
 """
 
-# ANSI colour codes for terminal output
-URGENCY_COLORS = {
+# ANSI colour codes for terminal output (read-only lookup tables)
+URGENCY_COLORS = MappingProxyType({
     "critical": "\033[91m",
     "urgent":   "\033[93m",
     "moderate": "\033[96m",
     "low":      "\033[92m",
     "none":     "\033[90m",
-}
+})
 RESET_COLOR = "\033[0m"
 BOLD = "\033[1m"
 
+# Recommended action per urgency level, keyed by triage/2's Level atom.
+_RECOMMENDED_ACTIONS = MappingProxyType({
+    "critical": "🚨 Seek IMMEDIATE emergency medical attention. Call emergency services NOW.",
+    "urgent":   "⚠️  Seek medical attention as soon as possible (within hours).",
+    "moderate":  "🩺 Schedule a medical appointment soon (within 24-48 hours).",
+    "low":      "💊 Monitor symptoms. Visit a healthcare provider if they persist or worsen.",
+    "none":     "ℹ️  No matching rules. Consider consulting a healthcare provider if concerned.",
+})
+
+# What triage/2's default clause reports when no rules match; returned
+# directly for the empty symptom list so that case never touches Prolog.
+_NO_MATCH_EXPLANATION = ('No triage rules matched the reported symptoms. '
+                         'Please seek professional medical advice.')
+
 
 # ---------------------------------------------------------------------------
 # Prolog Engine Wrapper
@@ -107,40 +141,102 @@ class TriageEngine:
 
     def __init__(self, kb_path: str | Path = KB_PATH):
         self.prolog = Prolog()
-        kb_posix = str(Path(kb_path).resolve()).replace("\\", "/")
-        if not Path(kb_path).exists():
+        if kb_path is KB_PATH:
+            kb_posix, kb_exists = _KB_POSIX, _KB_EXISTS
+        else:
+            kb_posix = str(Path(kb_path).resolve()).replace("\\", "/")
+            kb_exists = Path(kb_path).exists()
+        if not kb_exists:
             raise FileNotFoundError(f"Knowledge base not found: {kb_path}")
         self.prolog.consult(kb_posix)
         # Prevent SWI-Prolog from grabbing terminal control
         list(self.prolog.query("set_prolog_flag(tty_control, false)"))
         # Start with a clean symptom state
         list(self.prolog.query("clear_symptoms"))
+        # The symptom catalog is immutable after consult; filled lazily.
+        self._available_cache: list[tuple[str, str]] | None = None
+        self._available_dict: dict[str, str] = {}
+        # Mirror of the asserted symptom/1 facts. Lets mutations use
+        # pyswip's C-level assertz/retractall (no Prolog reader involved)
+        # while keeping add_symptom idempotent. NOTE: pyswip's clause
+        # database is process-global, so the mirror is only accurate while
+        # this instance is the sole user of symptom/1; callers that juggle
+        # several engines must clear_symptoms() before relying on it.
+        self._asserted: set[str] = set()
+
+    def _query_first(self, query: str) -> dict | None:
+        """Return the first solution of a query, or None if it fails.
+
+        For deterministic queries this skips the pointless backtracking
+        that list(...) forces just to confirm no further solutions exist.
+        """
+        gen = self.prolog.query(query)
+        try:
+            return next(gen, None)
+        finally:
+            gen.close()
 
     # --- Symptom management (delegates to Prolog predicates) ---
 
     def add_symptom(self, symptom: str) -> None:
-        """Assert a symptom fact in Prolog."""
-        list(self.prolog.query(f"add_symptom({symptom})"))
+        """Assert a symptom fact in Prolog (idempotent)."""
+        if not SYMPTOM_ID_RE.match(symptom) or symptom in self._asserted:
+            return
+        self.prolog.assertz(f"symptom({symptom})")
+        self._asserted.add(symptom)
+
+    def add_symptoms(self, symptoms: list[str]) -> None:
+        """Assert a list of symptom facts in a single Prolog query.
+
+        Batching avoids one pyswip round-trip per symptom. IDs that are not
+        valid Prolog atoms are dropped, matching add_symptom's behaviour
+        (they cannot appear in any rule anyway).
+        """
+        valid = [s for s in symptoms
+                 if SYMPTOM_ID_RE.match(s) and s not in self._asserted]
+        if not valid:
+            return
+        self._query_first(f"add_symptoms([{','.join(valid)}])")
+        self._asserted.update(valid)
 
     def remove_symptom(self, symptom: str) -> None:
-        """Retract a symptom fact from Prolog."""
-        list(self.prolog.query(f"remove_symptom({symptom})"))
+        """Retract a symptom fact from Prolog (a no-op if it is absent)."""
+        if not SYMPTOM_ID_RE.match(symptom):
+            return
+        self.prolog.retractall(f"symptom({symptom})")
+        self._asserted.discard(symptom)
 
     def clear_symptoms(self) -> None:
         """Remove all asserted symptom facts."""
-        list(self.prolog.query("clear_symptoms"))
+        self.prolog.retractall("symptom(_)")
+        self._asserted.clear()
 
     def get_current_symptoms(self) -> list[str]:
         """Query Prolog for the list of currently asserted symptoms."""
-        results = list(self.prolog.query("current_symptoms(S)"))
-        if results:
-            return [str(s) for s in results[0]["S"]]
+        result = self._query_first("current_symptoms(S)")
+        if result:
+            return list(map(str, result["S"]))
         return []
 
     def get_available_symptoms(self) -> list[tuple[str, str]]:
-        """Query Prolog for all recognized symptom IDs and descriptions."""
-        results = list(self.prolog.query("available_symptom(Id, Desc)"))
-        return [(str(r["Id"]), str(r["Desc"])) for r in results]
+        """Return all recognized symptom IDs and descriptions.
+
+        Queried from Prolog once and cached: the catalog cannot change
+        after the knowledge base is consulted.
+        """
+        if self._available_cache is None:
+            results = list(self.prolog.query("available_symptom(Id, Desc)"))
+            self._available_cache = [(str(r["Id"]), str(r["Desc"])) for r in results]
+            self._available_dict = dict(self._available_cache)
+        return self._available_cache
+
+    def describe_symptom(self, symptom: str) -> str:
+        """Return the human-readable description for a symptom ID.
+
+        Falls back to the ID itself for unrecognized symptoms.
+        """
+        self.get_available_symptoms()
+        return self._available_dict.get(symptom, symptom)
 
     # --- Triage queries (all reasoning happens in Prolog) ---
 
@@ -149,10 +245,10 @@ class TriageEngine:
         Query Prolog's triage/2 predicate.
         Returns (urgency_level, [explanation_strings]).
         """
-        results = list(self.prolog.query("triage(Level, Explanations)"))
-        if results:
-            level = str(results[0]["Level"])
-            explanations = [str(e) for e in results[0]["Explanations"]]
+        result = self._query_first("triage(Level, Explanations)")
+        if result:
+            level = str(result["Level"])
+            explanations = list(map(str, result["Explanations"]))
             return level, explanations
         return "none", ["Unable to determine triage level."]
 
@@ -161,16 +257,25 @@ class TriageEngine:
         Query Prolog for ALL matching urgency levels (not just the highest).
         Useful for showing the full reasoning breakdown to the user.
         """
-        all_levels = []
-        for level in ["critical", "urgent", "moderate", "low"]:
-            results = list(self.prolog.query(
-                f"fired_rules({level}, Rules), Rules \\= [], "
-                f"extract_explanations(Rules, Explanations)"
-            ))
-            if results:
-                explanations = [str(e) for e in results[0]["Explanations"]]
-                all_levels.append((level, explanations))
-        return all_levels
+        result = self._query_first("all_triage_levels(Levels)")
+        if not result:
+            return []
+        return [(str(item[0]), list(map(str, item[1:])))
+                for item in result["Levels"]]
+
+    def run_triage_full(self) -> tuple[str, list[str], list[tuple[str, list[str]]]]:
+        """
+        Query Prolog's triage_full/3 predicate: the highest-priority level,
+        its explanations, and the full per-level breakdown in one round-trip.
+        """
+        result = self._query_first("triage_full(Level, Explanations, AllLevels)")
+        if not result:
+            return "none", ["Unable to determine triage level."], []
+        level = str(result["Level"])
+        explanations = list(map(str, result["Explanations"]))
+        all_levels = [(str(item[0]), list(map(str, item[1:])))
+                      for item in result["AllLevels"]]
+        return level, explanations, all_levels
 
 
 # ---------------------------------------------------------------------------
@@ -193,51 +298,55 @@ def print_disclaimer():
 
 
 def display_symptom_menu(symptoms: list[tuple[str, str]]):
-    """Print the numbered list of available symptoms."""
-    print(f"\n{BOLD}Available Symptoms:{RESET_COLOR}")
-    print("-" * 50)
-    for i, (sid, desc) in enumerate(symptoms, 1):
-        print(f"  {i:>2}. {desc} ({sid})")
-    print("-" * 50)
-    print(f"  {BOLD} 0.  Done — Run triage{RESET_COLOR}")
-    print(f"  {BOLD}-1.  Clear all symptoms{RESET_COLOR}")
-    print(f"  {BOLD}-2.  Quit{RESET_COLOR}")
-    print()
+    """Print the numbered list of available symptoms.
+
+    Buffered into a single stdout write so redrawing the menu costs one
+    stream-lock acquisition instead of one per line.
+    """
+    lines = [
+        f"\n{BOLD}Available Symptoms:{RESET_COLOR}",
+        "-" * 50,
+        *(f"  {i:>2}. {desc} ({sid})" for i, (sid, desc) in enumerate(symptoms, 1)),
+        "-" * 50,
+        f"  {BOLD} 0.  Done — Run triage{RESET_COLOR}",
+        f"  {BOLD}-1.  Clear all symptoms{RESET_COLOR}",
+        f"  {BOLD}-2.  Quit{RESET_COLOR}",
+        "",
+    ]
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 def display_triage_result(level: str, explanations: list[str],
                           all_levels: list[tuple[str, list[str]]] | None = None):
-    """Format and display the triage result returned by Prolog."""
-    color = URGENCY_COLORS.get(level, "")
+    """Format and display the triage result returned by Prolog.
 
-    print(f"\n{'=' * 70}")
-    print(f"{BOLD}{color}  TRIAGE RESULT:  {level.upper()}{RESET_COLOR}")
-    print(f"{'=' * 70}")
+    Like display_symptom_menu, the whole report is buffered and written in
+    a single stdout call.
+    """
+    color = URGENCY_COLORS.get(level, "")
 
-    print(f"\n{BOLD}Triggered Rules (highest priority — {level.upper()}):{RESET_COLOR}")
+    lines = [
+        f"\n{'=' * 70}",
+        f"{BOLD}{color}  TRIAGE RESULT:  {level.upper()}{RESET_COLOR}",
+        f"{'=' * 70}",
+        f"\n{BOLD}Triggered Rules (highest priority — {level.upper()}):{RESET_COLOR}",
+    ]
     for i, exp in enumerate(explanations, 1):
-        print(f"  {color}▸ Rule {i}:{RESET_COLOR} {exp}")
+        lines.append(f"  {color}▸ Rule {i}:{RESET_COLOR} {exp}")
 
     if all_levels and len(all_levels) > 1:
-        print(f"\n{BOLD}Other matching levels (lower priority):{RESET_COLOR}")
+        lines.append(f"\n{BOLD}Other matching levels (lower priority):{RESET_COLOR}")
         for lvl, exps in all_levels:
             if lvl == level:
                 continue
             lvl_color = URGENCY_COLORS.get(lvl, "")
-            print(f"\n  {lvl_color}[{lvl.upper()}]{RESET_COLOR}")
-            for exp in exps:
-                print(f"    ▸ {exp}")
-
-    print(f"\n{BOLD}Recommended Action:{RESET_COLOR}")
-    actions = {
-        "critical": "🚨 Seek IMMEDIATE emergency medical attention. Call emergency services NOW.",
-        "urgent":   "⚠️  Seek medical attention as soon as possible (within hours).",
-        "moderate":  "🩺 Schedule a medical appointment soon (within 24-48 hours).",
-        "low":      "💊 Monitor symptoms. Visit a healthcare provider if they persist or worsen.",
-        "none":     "ℹ️  No matching rules. Consider consulting a healthcare provider if concerned.",
-    }
-    print(f"  {color}{actions.get(level, actions['none'])}{RESET_COLOR}")
-    print()
+            lines.append(f"\n  {lvl_color}[{lvl.upper()}]{RESET_COLOR}")
+            lines.extend(f"    ▸ {exp}" for exp in exps)
+
+    lines.append(f"\n{BOLD}Recommended Action:{RESET_COLOR}")
+    lines.append(f"  {color}{_RECOMMENDED_ACTIONS.get(level, _RECOMMENDED_ACTIONS['none'])}{RESET_COLOR}")
+    lines.append("")
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 # ---------------------------------------------------------------------------
@@ -263,13 +372,19 @@ def run_interactive():
         print("WARNING: No available symptoms loaded from knowledge base.")
         sys.exit(1)
 
+    # Precomputed once: O(1) recognition of symptom IDs typed by name.
+    known_ids = {sid for sid, _ in available}
+
+    # List preserves selection order for display; the set gives O(1)
+    # membership checks when deduplicating input.
     selected_symptoms: list[str] = []
+    selected_set: set[str] = set()
 
     while True:
         if selected_symptoms:
             print(f"\n{BOLD}Currently selected symptoms:{RESET_COLOR}")
             for sym in selected_symptoms:
-                desc = next((d for s, d in available if s == sym), sym)
+                desc = engine.describe_symptom(sym)
                 print(f"  ✓ {desc} ({sym})")
 
         display_symptom_menu(available)
@@ -287,43 +402,52 @@ def run_interactive():
         should_run_triage = False
 
         for entry in entries:
-            try:
-                num = int(entry)
-            except ValueError:
-                # Allow entering symptom IDs by name
-                matching = [s for s, d in available if s == entry.lower().replace(" ", "_")]
-                if matching:
-                    sym_id = matching[0]
-                    if sym_id not in selected_symptoms:
+            range_match = _RANGE_RE.match(entry)
+            if _NUM_RE.match(entry):
+                nums = [int(entry)]
+            elif range_match:
+                # Inclusive range of menu numbers, e.g. "3-6".
+                low, high = int(range_match.group(1)), int(range_match.group(2))
+                if not (1 <= low <= high <= len(available)):
+                    print(f"  ✗ Invalid range: '{entry}'")
+                    continue
+                nums = list(range(low, high + 1))
+            else:
+                # Allow entering symptom IDs by name (normalized once per token)
+                sym_id = entry.lower().replace(" ", "_")
+                if sym_id in known_ids:
+                    if sym_id not in selected_set:
                         engine.add_symptom(sym_id)
                         selected_symptoms.append(sym_id)
-                        desc = next((d for s, d in available if s == sym_id), sym_id)
+                        selected_set.add(sym_id)
+                        desc = engine.describe_symptom(sym_id)
                         print(f"  ✓ Added: {desc}")
                 else:
                     print(f"  ✗ Unknown input: '{entry}'")
                 continue
 
-            if num == 0:
-                should_run_triage = True
-                continue
-            elif num == -1:
-                engine.clear_symptoms()
-                selected_symptoms.clear()
-                print("  ✓ All symptoms cleared.")
-                continue
-            elif num == -2:
-                print("\nGoodbye! Remember: consult a real medical professional.\n")
-                return
-            elif 1 <= num <= len(available):
-                sym_id, desc = available[num - 1]
-                if sym_id in selected_symptoms:
-                    print(f"  ⓘ Already selected: {desc}")
+            for num in nums:
+                if num == 0:
+                    should_run_triage = True
+                elif num == -1:
+                    engine.clear_symptoms()
+                    selected_symptoms.clear()
+                    selected_set.clear()
+                    print("  ✓ All symptoms cleared.")
+                elif num == -2:
+                    print("\nGoodbye! Remember: consult a real medical professional.\n")
+                    return
+                elif 1 <= num <= len(available):
+                    sym_id, desc = available[num - 1]
+                    if sym_id in selected_set:
+                        print(f"  ⓘ Already selected: {desc}")
+                    else:
+                        engine.add_symptom(sym_id)
+                        selected_symptoms.append(sym_id)
+                        selected_set.add(sym_id)
+                        print(f"  ✓ Added: {desc}")
                 else:
-                    engine.add_symptom(sym_id)
-                    selected_symptoms.append(sym_id)
-                    print(f"  ✓ Added: {desc}")
-            else:
-                print(f"  ✗ Invalid number: {num}")
+                    print(f"  ✗ Invalid number: {num}")
 
         if should_run_triage:
             if not selected_symptoms:
@@ -350,6 +474,7 @@ def run_interactive():
             if again in ("y", "yes"):
                 engine.clear_symptoms()
                 selected_symptoms.clear()
+                selected_set.clear()
                 print("\n  ✓ Symptoms cleared for new assessment.\n")
             else:
                 print("\nGoodbye! Remember: consult a real medical professional.\n")
@@ -360,33 +485,107 @@ def run_interactive():
 # Programmatic API (used by test suite and external callers)
 # ---------------------------------------------------------------------------
 
-def run_triage_for_symptoms(symptoms: list[str]) -> dict:
+# Shared engine for the programmatic API. pyswip wraps a single
+# process-global SWI-Prolog instance: every TriageEngine sees the same
+# clause database (symptom/1 included) and queries cannot run
+# concurrently, so per-thread engines would give no isolation — each
+# would just re-consult the KB into the shared database. Instead one warm
+# engine is reused (consulting the knowledge base is by far the most
+# expensive step) and _ENGINE_LOCK is held across the entire
+# clear/assert/query sequence so concurrent callers cannot interleave
+# symptom state.
+_ENGINE: TriageEngine | None = None
+_ENGINE_LOCK = threading.Lock()
+
+
+def _get_engine() -> TriageEngine:
+    """Return the shared TriageEngine, constructing it on first use.
+
+    Callers must hold _ENGINE_LOCK.
     """
-    Programmatic API: run triage for a given list of symptom IDs.
+    global _ENGINE
+    if _ENGINE is None:
+        _ENGINE = TriageEngine()
+    return _ENGINE
 
-    Returns a dict with keys: level, explanations, all_levels, symptoms.
-    All reasoning is performed by Prolog; this function only marshals data.
+
+def reset_engine() -> None:
+    """Discard the shared engine so the next API call builds a fresh one.
+
+    Intended for callers (e.g. tests) that need a fully isolated engine,
+    or that have reloaded the knowledge base on disk. Also drops memoized
+    triage results, since those may have come from the old engine.
     """
-    engine = TriageEngine()
+    global _ENGINE
+    with _ENGINE_LOCK:
+        _ENGINE = None
+    _cached_triage.cache_clear()
 
-    for symptom in symptoms:
-        engine.add_symptom(symptom)
 
-    level, explanations = engine.run_triage()
+@lru_cache(maxsize=1024)
+def _cached_triage(key: frozenset, include_all_levels: bool) -> tuple:
+    """Run triage for a frozenset of symptom IDs, memoized.
 
-    try:
-        all_levels = engine.run_triage_all()
-        all_levels_dict = {lvl: exps for lvl, exps in all_levels}
-    except Exception:
-        all_levels_dict = {}
+    The triage decision is a pure function of the symptom set (the knowledge
+    base is immutable after consult), so identical queries can skip Prolog
+    entirely. Returns a hashable (level, explanations, all_levels) tuple.
+    """
+    with _ENGINE_LOCK:
+        engine = _get_engine()
+        engine.clear_symptoms()
+        engine.add_symptoms(sorted(key))
+
+        if include_all_levels:
+            level, explanations, all_levels = engine.run_triage_full()
+        else:
+            # triage/2 stops at the highest-priority level; skipping the
+            # full breakdown avoids evaluating every rule at every level.
+            level, explanations = engine.run_triage()
+            all_levels = []
+
+    return (
+        level,
+        tuple(explanations),
+        tuple((lvl, tuple(exps)) for lvl, exps in all_levels),
+    )
+
+
+def run_triage_for_symptoms(symptoms: list[str],
+                            include_all_levels: bool = False) -> dict:
+    """
+    Programmatic API: run triage for a given list of symptom IDs.
+
+    Returns a dict with keys: level, explanations, all_levels, symptoms.
+    All reasoning is performed by Prolog; this function only marshals data.
+    Results are memoized by symptom set, so repeated queries are O(1).
+
+    The per-level breakdown costs extra rule evaluation that most callers
+    never read, so "all_levels" stays empty unless include_all_levels is
+    set.
+    """
+    if not symptoms:
+        # With no symptom facts asserted, no rule can fire: this mirrors
+        # exactly what the Prolog default clause would return.
+        return {
+            "level": "none",
+            "explanations": [_NO_MATCH_EXPLANATION],
+            "all_levels": {},
+            "symptoms": symptoms,
+        }
+
+    level, explanations, all_levels = _cached_triage(frozenset(symptoms),
+                                                     include_all_levels)
 
     return {
         "level": level,
-        "explanations": explanations,
-        "all_levels": all_levels_dict,
+        "explanations": list(explanations),
+        "all_levels": {lvl: list(exps) for lvl, exps in all_levels},
         "symptoms": symptoms,
     }
 
 
+# Allow callers that reload the knowledge base to invalidate memoized results.
+run_triage_for_symptoms.cache_clear = _cached_triage.cache_clear
+
 if __name__ == "__main__":
     run_interactive()
@@ -229,6 +229,28 @@ triage_all(Results) :-
         Results
     ).
 
+% Like triage_all/1, but shaped as [Level | Explanations] lists so the
+% interface can unpack the whole breakdown from a single query instead of
+% probing each level separately. All four levels are evaluated inside one
+% findall, so the member/2 order below is purely the display order
+% (highest priority first), not a per-query probe cost to be tuned.
+all_triage_levels(Levels) :-
+    findall(
+        [Level | Explanations],
+        (   member(Level, [critical, urgent, moderate, low]),
+            fired_rules(Level, Rules),
+            Rules \= [],
+            extract_explanations(Rules, Explanations)
+        ),
+        Levels
+    ).
+
+% Combined entry point: the highest-priority result and the full per-level
+% breakdown in one query (one pyswip round-trip per triage).
+triage_full(Level, Explanations, AllLevels) :-
+    triage(Level, Explanations),
+    all_triage_levels(AllLevels).
+
 % Helper: extract explanation strings from rule/2 terms.
 extract_explanations([], []).
 extract_explanations([rule(_, Exp) | Rest], [Exp | Exps]) :-
@@ -241,6 +263,13 @@ extract_explanations([rule(_, Exp) | Rest], [Exp | Exps]) :-
 add_symptom(S) :-
     ( symptom(S) -> true ; assert(symptom(S)) ).
 
+% Batch variant: assert a whole list of symptoms in one query from the
+% interface, avoiding one pyswip round-trip per symptom. maplist/2 walks
+% the list in SWI-Prolog's native driver instead of user-level recursion,
+% and keeps add_symptom/1's duplicate guard.
+add_symptoms(Symptoms) :-
+    maplist(add_symptom, Symptoms).
+
 remove_symptom(S) :-
     retractall(symptom(S)).
 
@@ -156,6 +156,14 @@ class TestNoneAndEdgeCases(unittest.TestCase):
         result = run_triage_for_symptoms(["made_up_symptom_xyz"])
         self.assertEqual(result["level"], "none")
 
+    def test_empty_and_engine_paths_same_shape(self):
+        """The Prolog-free empty path returns the same dict shape as the engine path."""
+        empty = run_triage_for_symptoms([])
+        nonempty = run_triage_for_symptoms(["headache"])
+        self.assertEqual(set(empty.keys()), set(nonempty.keys()))
+        self.assertEqual(empty["all_levels"], {})
+        self.assertEqual(len(empty["explanations"]), 1)
+
 
 class TestPriorityOrdering(unittest.TestCase):
     """Test that higher-priority levels always win over lower ones."""
@@ -193,7 +201,7 @@ class TestComplexScenarios(unittest.TestCase):
             "high_fever", "persistent_vomiting",   # urgent
             "fever", "cough",                       # moderate
             "headache",                             # low
-        ])
+        ], include_all_levels=True)
         self.assertEqual(result["level"], "critical")
         self.assertIn("urgent", result.get("all_levels", {}))
 
@@ -201,8 +209,17 @@ class TestComplexScenarios(unittest.TestCase):
 class TestEngineManagement(unittest.TestCase):
     """Test the TriageEngine's symptom management functions."""
 
+    # Consulting the knowledge base is the expensive part, so the class
+    # shares one engine (per process/xdist worker) and each test starts
+    # from a clean symptom state instead of paying a fresh consult.
+    engine: TriageEngine
+
+    @classmethod
+    def setUpClass(cls):
+        cls.engine = TriageEngine()
+
     def setUp(self):
-        self.engine = TriageEngine()
+        self.engine.clear_symptoms()
 
     def test_add_and_list_symptoms(self):
         """Symptoms can be added and retrieved."""